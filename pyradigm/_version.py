@@ -0,0 +1,2 @@
+def get_versions():
+    return {"version": "0+local"}
@@ -10,12 +10,128 @@ import random
 import sys
 import traceback
 from warnings import warn, catch_warnings, filterwarnings, simplefilter
-from collections.abc import Sequence
+from collections.abc import Mapping, MutableMapping, Sequence
 from collections import Counter, OrderedDict
+from functools import reduce
 from itertools import islice
 from os.path import basename, dirname, exists as pexists, isfile, join as pjoin, realpath
 
 
+# preferred attributes to be used with MLDataset, shared by all instances
+_MLDATASET_DIR = ('add_sample',
+                  'add_samples',
+                  'glance',
+                  'summarize_classes',
+                  'sample_ids_in_class',
+                  'train_test_split_ids',
+                  'random_subset_ids',
+                  'random_subset_ids_by_count',
+                  'classes',
+                  'class_set',
+                  'class_sizes',
+                  'data_and_labels',
+                  'get_data_matrix_in_order',
+                  'data',
+                  'del_sample',
+                  'description',
+                  'extend',
+                  'feature_names',
+                  'get',
+                  'get_class',
+                  'get_subset',
+                  'random_subset',
+                  'get_feature_subset',
+                  'keys',
+                  'labels',
+                  'label_set',
+                  'num_classes',
+                  'num_features',
+                  'num_samples',
+                  'sample_ids',
+                  'save',
+                  'compatible',
+                  'transform',
+                  'add_classes')
+
+
+class _SampleFeatures(Mapping):
+    """
+    Read-only dict-like view of the features of each sample in an MLDataset.
+
+    Copies and pickles are plain OrderedDicts.
+    """
+
+    def __init__(self, dataset):
+        self._dataset = dataset
+
+    def __getitem__(self, sample_id):
+        return self._dataset[sample_id]
+
+    def __contains__(self, sample_id):
+        return sample_id in self._dataset
+
+    def __iter__(self):
+        return iter(self._dataset.keys)
+
+    def __len__(self):
+        return len(self._dataset)
+
+    def __reduce__(self):
+        return OrderedDict, (list(self.items()),)
+
+
+class _SampleValues(MutableMapping):
+    """
+    Dict-like view of the labels or classes of samples in an MLDataset.
+
+    Changing the value of an existing sample stores it back into the dataset.
+    Adding or removing ids leaves the dataset untouched, and turns this view
+    into a standalone copy, which can be assigned back to the dataset as a whole.
+    Copies and pickles are plain OrderedDicts.
+    """
+
+    def __init__(self, values, store):
+        self._values = values
+        self._store = store
+
+    def __getitem__(self, sample_id):
+        return self._values[sample_id]
+
+    def __setitem__(self, sample_id, value):
+        if self._store is not None and sample_id in self._values:
+            self._store(sample_id, value)
+        else:
+            self._detach()
+            self._values[sample_id] = value
+
+    def __delitem__(self, sample_id):
+        self._detach()
+        del self._values[sample_id]
+
+    def __contains__(self, sample_id):
+        return sample_id in self._values
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return repr(self._values)
+
+    def __reduce__(self):
+        return OrderedDict, (list(self._values.items()),)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(OrderedDict(self._values), memo)
+
+    def _detach(self):
+        if self._store is not None:
+            self._values = OrderedDict(self._values)
+            self._store = None
+
+
 # TODO profile the class for different scales of samples and features
 class MLDataset(object):
     """An ML dataset to ease workflow and maintain integrity."""
@@ -27,7 +143,9 @@ class MLDataset(object):
                  data=None, labels=None, classes=None,
                  description='',
                  feature_names=None,
-                 encode_nonnumeric=False):
+                 encode_nonnumeric=False,
+                 dtype=np.float64,
+                 copy_dicts=True):
         """
         Default constructor.
         Recommended way to construct the dataset is via add_sample method, one sample
@@ -75,6 +193,21 @@ class MLDataset(object):
             It is usually better to encode your data at the source,
             and them import them to Use with caution!
 
+        dtype : numpy dtype
+            Data type of the matrix holding the features of all the samples.
+            Features added later are converted to this type.
+            Smaller types such as np.float32 halve the memory footprint,
+            at the cost of precision.
+            Ignored when loading or copying an existing dataset.
+            Default : np.float64
+
+        copy_dicts : bool
+            Flag to specify whether to make copies of the labels and classes dicts.
+            Set it to False to take ownership of the given dicts without copying,
+            when they are not going to be modified elsewhere.
+            Features in data are always copied into the dataset.
+            Default : True
+
         Raises
         ------
         ValueError
@@ -85,6 +218,7 @@ class MLDataset(object):
 
         """
 
+        self.__dtype = np.dtype(dtype)
         if filepath is not None:
             if isfile(realpath(filepath)):
                 # print('Loading the dataset from: {}'.format(filepath))
@@ -106,11 +240,13 @@ class MLDataset(object):
         elif data is None and labels is None and classes is None:
             # TODO refactor the code to use only basic dict,
             # as it allows for better equality comparisons
-            self.__data = OrderedDict()
+            self.__index_rows(())
+            self.__feature_matrix = np.empty((0, 0), dtype=self.__dtype)
             self.__labels = OrderedDict()
+            self.__labels_array = np.empty(0, dtype=object)
             self.__classes = OrderedDict()
+            self.__init_class_tally()
             self.__num_features = 0
-            self.__dtype = None
             self.__description = ''
             self.__feature_names = None
         elif data is not None and labels is not None and classes is not None:
@@ -120,17 +256,17 @@ class MLDataset(object):
 
             # OrderedDict to ensure the order is maintained when
             # data/labels are returned in a matrix/array form
-            self.__data = OrderedDict(data)
-            self.__labels = OrderedDict(labels)
-            self.__classes = OrderedDict(classes)
+            # read-only mappings such as labels of another dataset are always copied
+            if copy_dicts or not isinstance(labels, dict):
+                labels = OrderedDict(labels)
+            if copy_dicts or not isinstance(classes, dict):
+                classes = OrderedDict(classes)
+            self.__set_data(data)
+            self.__set_labels(labels)
+            self.__set_classes(classes)
             self.__description = description
 
-            sample_ids = list(data)
-            features0 = data[sample_ids[0]]
-            self.__num_features = features0.size if isinstance(features0,
-                                                               np.ndarray) else len(
-                features0)
-            self.__dtype = type(data[sample_ids[0]])
+            self.__num_features = self.__feature_matrix.shape[1]
 
             # assigning default names for each feature
             if feature_names is None:
@@ -144,8 +280,12 @@ class MLDataset(object):
 
     @property
     def data(self):
-        """data in its original dict form."""
-        return self.__data
+        """
+        data in its original dict form, as a read-only view of the feature matrix.
+
+        Features of a sample are looked up only when accessed.
+        """
+        return _SampleFeatures(self)
 
 
     def data_and_labels(self):
@@ -166,15 +306,14 @@ class MLDataset(object):
 
         """
 
+        self.__compact()
         sample_ids = np.array(self.keys)
-        label_dict = self.labels
-        matrix = np.full([self.num_samples, self.num_features], np.nan)
-        labels = np.full([self.num_samples, 1], np.nan)
-        for ix, sample in enumerate(sample_ids):
-            matrix[ix, :] = self.__data[sample]
-            labels[ix] = label_dict[sample]
+        # rows are already stored contiguously in the order of sample_ids,
+        #   so this is a single pass over the used part of the feature matrix
+        matrix = self.__feature_matrix[:self.num_samples].copy()
+        labels = self.__labels_array[:self.num_samples].astype(np.float64)
 
-        return matrix, np.ravel(labels), sample_ids
+        return matrix, labels, sample_ids
 
 
     @data.setter
@@ -195,20 +334,28 @@ class MLDataset(object):
         ------
         ValueError
             If number of samples does not match the size of existing set, or
+            If sample ids do not match the previously assigned ids, or
             If atleast one sample is not provided.
 
         """
-        if isinstance(values, dict):
-            if self.__labels is not None and len(self.__labels) != len(values):
+        if isinstance(values, Mapping):
+            if len(self.__labels) != len(values):
                 raise ValueError(
                     'number of samples do not match the previously assigned labels')
             elif len(values) < 1:
                 raise ValueError('There must be at least 1 sample in the dataset!')
+            elif values.keys() != self.__labels.keys():
+                raise ValueError('sample ids do not match the previously assigned ids.')
             else:
-                self.__data = values
+                self.__check_num_features(values)
+                self.__set_data(values)
+                # rows now follow the order of values, so labels and classes
+                #   must be gathered again in that order
+                self.__set_labels(self.__labels)
+                self.__set_classes(self.__classes)
                 # update dimensionality
                 # assuming all keys in dict have same len arrays
-                self.__num_features = len(values[self.keys[0]])
+                self.__num_features = self.__feature_matrix.shape[1]
 
             if feature_names is None:
                 self.__feature_names = self.__str_names(self.num_features)
@@ -220,23 +367,27 @@ class MLDataset(object):
 
     @property
     def labels(self):
-        """Returns the array of labels for all the samples."""
+        """
+        Returns the labels for all the samples, in a dict-like view.
+
+        Changing the label of a sample in it also updates the dataset.
+        """
         # TODO numeric label need to be removed,
         # as this can be made up on the fly as needed from str to num encoders.
-        return self.__labels
+        return _SampleValues(self.__labels, self.__store_label)
 
 
     @labels.setter
     def labels(self, values):
         """Class labels (such as 1, 2, -1, 'A', 'B' etc.) for each sample in the dataset."""
-        if isinstance(values, dict):
-            if self.__data is not None and len(self.__data) != len(values):
+        if isinstance(values, Mapping):
+            if len(self.__row_index) != len(values):
                 raise ValueError(
                     'number of samples do not match the previously assigned data')
-            elif set(self.keys) != set(list(values)):
+            elif self.__row_index.keys() != values.keys():
                 raise ValueError('sample ids do not match the previously assigned ids.')
             else:
-                self.__labels = values
+                self.__set_labels(OrderedDict(values))
         else:
             raise ValueError('labels input must be a dictionary!')
 
@@ -246,21 +397,24 @@ class MLDataset(object):
         """
         Identifiers (sample IDs, or sample names etc)
             forming the basis of dict-type MLDataset.
+
+        Returned in a dict-like view, in which changing the class of a sample
+        also updates the dataset, including its class sizes.
         """
-        return self.__classes
+        return _SampleValues(self.__classes, self.__store_class)
 
 
     @classes.setter
     def classes(self, values):
         """Classes setter."""
-        if isinstance(values, dict):
-            if self.__data is not None and len(self.__data) != len(values):
+        if isinstance(values, Mapping):
+            if len(self.__row_index) != len(values):
                 raise ValueError(
                     'number of samples do not match the previously assigned data')
-            elif set(self.keys) != set(list(values)):
+            elif self.__row_index.keys() != values.keys():
                 raise ValueError('sample ids do not match the previously assigned ids.')
             else:
-                self.__classes = values
+                self.__set_classes(OrderedDict(values))
         else:
             raise ValueError('classes input must be a dictionary!')
 
@@ -289,7 +443,10 @@ class MLDataset(object):
     @property
     def class_sizes(self):
         """Returns the sizes of different objects in a Counter object."""
-        return Counter(self.classes.values())
+        # counts are maintained per integer class code as samples are added or removed
+        return Counter({cls: size for cls, size in zip(self.__class_index,
+                                                       self.__class_tally.tolist())
+                        if size > 0})
 
 
     @staticmethod
@@ -319,7 +476,7 @@ class MLDataset(object):
 
         """
         nitems = max([1, min([nitems, self.num_samples - 1])])
-        return self.__take(nitems, iter(self.__data.items()))
+        return self.__take(nitems, iter(self))
 
 
     def summarize_classes(self):
@@ -339,12 +496,14 @@ class MLDataset(object):
 
         """
 
-        class_sizes = np.zeros(len(self.class_set))
-        for idx, cls in enumerate(self.class_set):
-            class_sizes[idx] = self.class_sizes[cls]
+        sizes = self.class_sizes
+        class_set = list(sizes)
+        class_sizes = np.zeros(len(class_set))
+        for idx, cls in enumerate(class_set):
+            class_sizes[idx] = sizes[cls]
 
         # TODO consider returning numeric label set e.g. for use in scikit-learn
-        return self.class_set, self.label_set, class_sizes
+        return class_set, self.label_set, class_sizes
 
 
     @classmethod
@@ -414,11 +573,11 @@ class MLDataset(object):
             If dimensionality of the current sample does not match the current, or
             If `feature_names` do not match existing names
         TypeError
-            If sample to be added is of different data type compared to existing samples.
+            If features can not be converted to the data type of this dataset.
 
         """
 
-        if sample_id in self.__data and not overwrite:
+        if sample_id in self.__row_index and not overwrite:
             raise ValueError('{} already exists in this dataset!'.format(sample_id))
 
         # ensuring there is always a class name, even when not provided by the user.
@@ -428,15 +587,12 @@ class MLDataset(object):
         if class_id is None:
             class_id = str(label)
 
-        features = self.check_features(features)
+        features = self.__cast_features(self.check_features(features))
         if self.num_samples <= 0:
-            self.__data[sample_id] = features
-            self.__labels[sample_id] = label
-            self.__classes[sample_id] = class_id
-            self.__dtype = type(features)
-            self.__num_features = features.size if isinstance(features,
-                                                              np.ndarray) else len(
-                features)
+            self.__num_features = features.size
+            self.__index_rows(())
+            self.__allocate(1)
+            self.__store_row(sample_id, features, label, class_id)
             if feature_names is None:
                 self.__feature_names = self.__str_names(self.num_features)
         else:
@@ -444,12 +600,8 @@ class MLDataset(object):
                 raise ValueError('dimensionality of this sample ({}) '
                                  'does not match existing samples ({})'
                                  ''.format(features.size, self.__num_features))
-            if not isinstance(features, self.__dtype):
-                raise TypeError("Mismatched dtype. Provide {}".format(self.__dtype))
 
-            self.__data[sample_id] = features
-            self.__labels[sample_id] = label
-            self.__classes[sample_id] = class_id
+            self.__store_row(sample_id, features, label, class_id)
             if feature_names is not None:
                 # if it was never set, allow it
                 # class gets here when adding the first sample,
@@ -462,6 +614,259 @@ class MLDataset(object):
                             "supplied feature names do not match the existing names!")
 
 
+    def add_samples(self, sample_ids, features, labels,
+                    class_ids=None,
+                    feature_names=None):
+        """Adds a batch of new samples to the dataset in a single step.
+
+        Equivalent to calling add_sample for each row of `features`,
+        but much faster when importing many samples at once.
+
+        Parameters
+        ----------
+
+        sample_ids : list
+            Identifiers that uniquely identify each of the new samples.
+        features : ndarray
+            2D array of shape [len(sample_ids), num_features],
+            with features for each sample in the same order as `sample_ids`
+        labels : list, ndarray
+            The label for each new sample
+        class_ids : list, ndarray
+            The class for each new sample.
+            If not provided, labels converted to strings become their IDs.
+        feature_names : list
+            The names for each feature. Assumed to be in the same order as columns
+            of `features`
+
+        Raises
+        ------
+        ValueError
+            If no samples are given, or
+            If any of `sample_ids` are repeated or already in the MLDataset, or
+            If the sizes of `sample_ids`, `features`, `labels` and `class_ids` differ, or
+            If dimensionality of the new samples does not match the current, or
+            If `feature_names` do not match existing names
+        TypeError
+            If features can not be converted to the data type of this dataset.
+
+        """
+
+        sample_ids = list(sample_ids)
+        labels = list(labels)
+        if class_ids is None:
+            class_ids = [str(label) for label in labels]
+        else:
+            class_ids = list(class_ids)
+
+        num_new = len(sample_ids)
+        if num_new < 1:
+            raise ValueError('No samples provided to add!')
+        if len(set(sample_ids)) < num_new:
+            raise ValueError('sample ids to be added must be unique!')
+        existing = [sid for sid in sample_ids if sid in self.__row_index]
+        if len(existing) > 0:
+            raise ValueError('{} already exist in this dataset!'.format(existing))
+
+        features = self.__cast_features(features)
+        if features.ndim != 2 or features.shape[0] != num_new:
+            raise ValueError('features must be a 2D array with one row '
+                             'for each of the {} samples'.format(num_new))
+        if not len(labels) == len(class_ids) == num_new:
+            raise ValueError('Lengths of sample ids, labels and classes do not match!')
+        if features.size <= 0:
+            raise ValueError('provided features are empty.')
+
+        if self.num_samples <= 0:
+            self.__num_features = features.shape[1]
+            self.__index_rows(())
+            self.__allocate(num_new)
+            if feature_names is None:
+                self.__feature_names = self.__str_names(self.num_features)
+        elif self.__num_features != features.shape[1]:
+            raise ValueError('dimensionality of these samples ({}) '
+                             'does not match existing samples ({})'
+                             ''.format(features.shape[1], self.__num_features))
+
+        if feature_names is not None:
+            if self.__feature_names is None or self.num_samples <= 0:
+                self.__feature_names = np.array(feature_names)
+            elif not np.array_equal(self.feature_names, np.array(feature_names)):
+                raise ValueError(
+                    "supplied feature names do not match the existing names!")
+
+        # one contiguous block copy for all the rows, instead of one per sample
+        start = self.__num_rows
+        self.__reserve(start + num_new)
+        self.__feature_matrix[start:start + num_new] = features
+        self.__labels_array[start:start + num_new] = labels
+        codes = [self.__class_code(cls) for cls in class_ids]
+        self.__class_codes[start:start + num_new] = codes
+        self.__class_tally += np.bincount(codes, minlength=len(self.__class_index))
+        self.__row_index.update(zip(sample_ids, range(start, start + num_new)))
+        self.__num_rows += num_new
+        self.__num_samples += num_new
+        self.__labels.update(zip(sample_ids, labels))
+        self.__classes.update(zip(sample_ids, class_ids))
+
+
+    def __init_class_tally(self):
+        """Initializes the bookkeeping of classes as integer codes, with no classes."""
+
+        self.__class_index = OrderedDict()
+        self.__class_codes = np.empty(0, dtype=np.intp)
+        self.__class_tally = np.zeros(0, dtype=np.intp)
+
+
+    def __class_code(self, class_id):
+        """Returns the integer code of class_id, assigning a new code if needed."""
+
+        code = self.__class_index.get(class_id)
+        if code is None:
+            code = len(self.__class_index)
+            self.__class_index[class_id] = code
+            self.__class_tally = np.append(self.__class_tally, 0)
+
+        return code
+
+
+    def __store_row(self, sample_id, features, label, class_id):
+        """Writes a sample into the row of sample_id, appending a row if new."""
+
+        if sample_id in self.__row_index:
+            row = self.__row_index[sample_id]
+            # overwriting an existing sample, which may change its class
+            self.__class_tally[self.__class_codes[row]] -= 1
+        else:
+            row = self.__num_rows
+            self.__reserve(row + 1)
+            self.__row_index[sample_id] = row
+            self.__num_rows += 1
+            self.__num_samples += 1
+
+        self.__feature_matrix[row] = features
+        self.__labels_array[row] = label
+        self.__labels[sample_id] = label
+        code = self.__class_code(class_id)
+        self.__class_codes[row] = code
+        self.__class_tally[code] += 1
+        self.__classes[sample_id] = class_id
+
+
+    def __store_label(self, sample_id, label):
+        """Changes the label of an existing sample."""
+
+        features = self.__feature_matrix[self.__row_index[sample_id]]
+        self.__store_row(sample_id, features, label, self.__classes[sample_id])
+
+
+    def __store_class(self, sample_id, class_id):
+        """Changes the class of an existing sample."""
+
+        features = self.__feature_matrix[self.__row_index[sample_id]]
+        self.__store_row(sample_id, features, self.__labels[sample_id], class_id)
+
+
+    def __allocate(self, capacity):
+        """Allocates empty columns to hold features, labels and classes of samples."""
+
+        self.__feature_matrix = np.empty((capacity, self.__num_features),
+                                         dtype=self.__dtype)
+        self.__labels_array = np.empty(capacity, dtype=object)
+        self.__class_codes = np.empty(capacity, dtype=np.intp)
+
+
+    def __cast_features(self, features):
+        """Converts the features to the data type of this dataset."""
+
+        try:
+            return np.asarray(features, dtype=self.__dtype)
+        except (TypeError, ValueError):
+            raise TypeError("Mismatched dtype. Provide {}".format(self.__dtype))
+
+
+    def __reserve(self, num_rows):
+        """Grows all the columns geometrically to hold at least num_rows samples."""
+
+        capacity = self.__feature_matrix.shape[0]
+        if num_rows <= capacity:
+            return
+
+        num_used = self.__num_rows
+        features, labels = self.__feature_matrix, self.__labels_array
+        class_codes = self.__class_codes
+        self.__allocate(max(num_rows, 2 * capacity))
+        self.__feature_matrix[:num_used] = features[:num_used]
+        self.__labels_array[:num_used] = labels[:num_used]
+        self.__class_codes[:num_used] = class_codes[:num_used]
+
+
+    def __index_rows(self, sample_ids):
+        """Maps the sample ids to consecutive rows, in the given order."""
+
+        self.__row_index = OrderedDict((sid, row) for row, sid in enumerate(sample_ids))
+        self.__num_samples = len(self.__row_index)
+        # rows in use, including those of deleted samples until the next compaction
+        self.__num_rows = self.__num_samples
+
+
+    def __compact(self):
+        """Drops the rows of deleted samples, so the rest are contiguous and in order."""
+
+        if self.__num_rows == self.__num_samples:
+            return
+
+        # rows always increase along the sample ids, as new samples are appended
+        rows = np.fromiter(self.__row_index.values(), dtype=np.intp,
+                           count=self.__num_samples)
+        # gathering into new buffers, in one pass per column
+        self.__feature_matrix = np.take(self.__feature_matrix, rows, axis=0)
+        self.__labels_array = np.take(self.__labels_array, rows)
+        self.__class_codes = np.take(self.__class_codes, rows)
+        self.__index_rows(self.__row_index)
+
+
+    def __set_data(self, data):
+        """Stores a dict of features as rows of a single contiguous matrix."""
+
+        # building the matrix first, so the dataset is left intact if it fails
+        if len(data) > 0:
+            matrix = self.__cast_features([np.ravel(features)
+                                           for features in data.values()])
+        else:
+            matrix = np.empty((0, 0), dtype=self.__dtype)
+
+        self.__index_rows(data)
+        self.__feature_matrix = matrix
+        self.__dtype = matrix.dtype
+
+
+    def __set_labels(self, labels):
+        """Stores the dict of labels, along with a column parallel to feature rows."""
+
+        self.__compact()
+        self.__labels = labels
+        self.__labels_array = np.empty(self.__feature_matrix.shape[0], dtype=object)
+        self.__labels_array[:self.num_samples] = [labels[sid]
+                                                  for sid in self.__row_index]
+
+
+    def __set_classes(self, classes):
+        """Stores the dict of classes, along with a column parallel to feature rows."""
+
+        self.__compact()
+        self.__init_class_tally()
+        self.__classes = classes
+        # factorizing the class ids into integer codes, in order of appearance
+        codes = [self.__class_index.setdefault(classes[sid], len(self.__class_index))
+                 for sid in self.__row_index]
+        self.__class_codes = np.empty(self.__feature_matrix.shape[0], dtype=np.intp)
+        self.__class_codes[:self.num_samples] = codes
+        # tallying the codes in a single C-level pass, without any hashing
+        self.__class_tally = np.bincount(self.__class_codes[:self.num_samples],
+                                         minlength=len(self.__class_index))
+
+
     def del_sample(self, sample_id):
         """
         Method to remove a sample from the dataset.
@@ -477,10 +882,14 @@ class MLDataset(object):
             If sample id to delete was not found in the dataset.
 
         """
-        if sample_id not in self.__data:
+        if sample_id not in self.__row_index:
             warn('Sample to delete not found in the dataset - nothing to do.')
         else:
-            self.__data.pop(sample_id)
+            row = self.__row_index.pop(sample_id)
+            # leaving its row as a gap until the next compaction,
+            #   so deleting does not move or reindex any other sample
+            self.__num_samples -= 1
+            self.__class_tally[self.__class_codes[row]] -= 1
             self.__classes.pop(sample_id)
             self.__labels.pop(sample_id)
             print('{} removed.'.format(sample_id))
@@ -513,13 +922,17 @@ class MLDataset(object):
                                     'Max index: {} Min index : 0'.format(
                 self.__num_features))
 
-        sub_data = {sample: features[subset_idx] for sample, features in
-                    self.__data.items()}
-        new_descr = 'Subset features derived from: \n ' + self.__description
-        subdataset = MLDataset(data=sub_data,
-                               labels=self.__labels, classes=self.__classes,
-                               description=new_descr,
+        # selecting the columns of all the samples at once
+        self.__compact()
+        sample_ids = self.keys
+        subdataset = MLDataset(dtype=self.__dtype)
+        subdataset.add_samples(sample_ids,
+                               self.__feature_matrix[:self.num_samples][:, subset_idx],
+                               self.__labels_array[:self.num_samples],
+                               [self.__classes[sid] for sid in sample_ids],
                                feature_names=self.__feature_names[subset_idx])
+        subdataset.description = 'Subset features derived from: \n ' + \
+                                 self.__description
 
         return subdataset
 
@@ -528,7 +941,7 @@ class MLDataset(object):
     def keys_with_value(dictionary, value):
         "Returns a subset of keys from the dict with the value supplied."
 
-        subset = [key for key in dictionary if dictionary[key] == value]
+        subset = [key for key, val in dictionary.items() if val == value]
 
         return subset
 
@@ -567,12 +980,16 @@ class MLDataset(object):
             raise ValueError(
                 'These classes {} do not exist in this dataset.'.format(non_existent))
 
-        subsets = list()
-        for class_id in class_ids:
-            subsets_this_class = self.keys_with_value(self.__classes, class_id)
-            subsets.extend(subsets_this_class)
+        # comparing integer class codes over all the rows in a single vectorized pass
+        self.__compact()
+        codes = [self.__class_index[cls] for cls in set(class_ids)
+                 if cls in self.__class_index]
+        rows = np.flatnonzero(np.isin(self.__class_codes[:self.num_samples], codes))
+        if len(rows) < 1:
+            warn('subset of IDs requested do not exist in the dataset!')
+            return MLDataset()
 
-        return self.get_subset(subsets)
+        return self.__get_subset_from_rows(rows)
 
 
     def transform(self, func, func_description=None):
@@ -638,14 +1055,19 @@ class MLDataset(object):
         if not callable(func):
             raise TypeError('Given function {} is not a callable'.format(func))
 
-        xfm_ds = MLDataset()
-        for sample, data in self.__data.items():
+        xfm_features = OrderedDict()
+        for sample, data in self:
             try:
-                xfm_data = func(data)
+                xfm_features[sample] = self.check_features(func(data))
             except:
                 print('Unable to transform features for {}. Quitting.'.format(sample))
                 raise
 
+        # data type follows the transformed features e.g. floats from np.log of ints
+        dtypes = [features.dtype for features in xfm_features.values()]
+        xfm_dtype = reduce(np.promote_types, dtypes) if dtypes else self.__dtype
+        xfm_ds = MLDataset(dtype=xfm_dtype)
+        for sample, xfm_data in xfm_features.items():
             xfm_ds.add_sample(sample, xfm_data,
                               label=self.__labels[sample],
                               class_id=self.__classes[sample])
@@ -887,24 +1309,16 @@ class MLDataset(object):
 
         """
 
-        num_existing_keys = sum([1 for key in subset_ids if key in self.__data])
-        if subset_ids is not None and num_existing_keys > 0:
-            # ensure items are added to data, labels etc in the same order of sample IDs
-            # TODO come up with a way to do this even when not using OrderedDict()
-            # putting the access of data, labels and classes in the same loop  would
-            # ensure there is correspondence across the three attributes of the class
-            data = self.__get_subset_from_dict(self.__data, subset_ids)
-            labels = self.__get_subset_from_dict(self.__labels, subset_ids)
-            if self.__classes is not None:
-                classes = self.__get_subset_from_dict(self.__classes, subset_ids)
-            else:
-                classes = None
-            subdataset = MLDataset(data=data, labels=labels, classes=classes)
-            # Appending the history
-            subdataset.description += '\n Subset derived from: ' + self.description
-            subdataset.feature_names = self.__feature_names
-            subdataset.__dtype = self.dtype
-            return subdataset
+        if subset_ids is not None:
+            self.__compact()
+            # one pass over the requested IDs, in the order they were requested
+            rows = [self.__row_index[sid] for sid in OrderedDict.fromkeys(subset_ids)
+                    if sid in self.__row_index]
+        else:
+            rows = list()
+
+        if len(rows) > 0:
+            return self.__get_subset_from_rows(rows)
         else:
             warn('subset of IDs requested do not exist in the dataset!')
             return MLDataset()
@@ -936,20 +1350,18 @@ class MLDataset(object):
         if isinstance(subset_ids, str):
             subset_ids = [subset_ids, ]
 
-        num_existing_keys = sum([1 for key in subset_ids if key in self.__data])
-        if num_existing_keys < len(subset_ids):
+        # single pass over subset_ids, looking up rows rather than counting first
+        try:
+            rows = [self.__row_index[sid] for sid in subset_ids]
+        except KeyError:
             raise ValueError('One or more IDs from  subset do not exist in the dataset!')
 
-        matrix = np.full((num_existing_keys, self.num_features), np.nan)
-        for idx, sid in enumerate(subset_ids):
-            matrix[idx, :] = self.__data[sid]
-
-        return matrix
+        return self.__feature_matrix[rows]
 
 
     def __contains__(self, item):
         "Boolean test of membership of a sample in the dataset."
-        if item in self.keys:
+        if item in self.__row_index:
             return True
         else:
             return False
@@ -958,8 +1370,8 @@ class MLDataset(object):
     def get(self, item, not_found_value=None):
         "Method like dict.get() which can return specified value if key not found"
 
-        if item in self.keys:
-            return self.__data[item]
+        if item in self.__row_index:
+            return self.__feature_matrix[self.__row_index[item]].copy()
         else:
             return not_found_value
 
@@ -967,8 +1379,9 @@ class MLDataset(object):
     def __getitem__(self, item):
         "Method to ease data retrieval i.e. turn dataset.data['id'] into dataset['id'] "
 
-        if item in self.keys:
-            return self.__data[item]
+        if item in self.__row_index:
+            # a copy, so it is not affected by later changes to the dataset
+            return self.__feature_matrix[self.__row_index[item]].copy()
         else:
             raise KeyError('{} not found in dataset.'.format(item))
 
@@ -976,13 +1389,13 @@ class MLDataset(object):
     def __setitem__(self, item, features):
         """Method to replace features for existing samplet"""
 
-        if item in self.__data:
-            features = self.check_features(features)
+        if item in self.__row_index:
+            features = self.__cast_features(self.check_features(features))
             if self.__num_features != features.size:
                 raise ValueError('dimensionality of supplied features ({}) '
                                  'does not match existing samples ({})'
                                  ''.format(features.size, self.__num_features))
-            self.__data[item] = features
+            self.__store_row(item, features, self.__labels[item], self.__classes[item])
         else:
             raise KeyError('{} not found in dataset.'
                            ' Can not replace features of a non-existing sample.'
@@ -991,22 +1404,43 @@ class MLDataset(object):
     def __iter__(self):
         "Iterator over samples"
 
-        for subject, data in self.data.items():
-            yield subject, data
+        for subject, row in self.__row_index.items():
+            yield subject, self.__feature_matrix[row].copy()
 
 
-    @staticmethod
-    def __get_subset_from_dict(input_dict, subset):
-        # Using OrderedDict helps ensure data are added to data, labels etc
-        # in the same order of sample IDs
-        return OrderedDict(
-                (sid, value) for sid, value in input_dict.items() if sid in subset)
+    def __get_subset_from_rows(self, rows):
+        """Returns a new dataset made of the given rows (of a compact dataset), in order."""
+
+        keys = self.keys
+        sample_ids = [keys[row] for row in rows]
+
+        subdataset = MLDataset(dtype=self.__dtype)
+        subdataset.__num_features = self.__num_features
+        subdataset.__index_rows(sample_ids)
+        # one contiguous copy per column, keeping data, labels and classes in sync
+        subdataset.__feature_matrix = np.take(self.__feature_matrix, rows, axis=0)
+        subdataset.__labels_array = np.take(self.__labels_array, rows)
+        subdataset.__labels = OrderedDict(zip(sample_ids,
+                                              subdataset.__labels_array.tolist()))
+        subdataset.__classes = OrderedDict((sid, self.__classes[sid])
+                                           for sid in sample_ids)
+        # reusing the class codes, so there is no need to factorize them again
+        subdataset.__class_index = OrderedDict(self.__class_index)
+        subdataset.__class_codes = np.take(self.__class_codes, rows)
+        subdataset.__class_tally = np.bincount(subdataset.__class_codes,
+                                               minlength=len(self.__class_index))
+
+        # Appending the history
+        subdataset.description += '\n Subset derived from: ' + self.description
+        subdataset.feature_names = self.__feature_names
+
+        return subdataset
 
 
     @property
     def keys(self):
         """Sample identifiers (strings) - the basis of MLDataset (same as sample_ids)"""
-        return list(self.__data)
+        return list(self.__row_index)
 
 
     @property
@@ -1042,33 +1476,32 @@ class MLDataset(object):
 
     @property
     def dtype(self):
-        """number of features in each sample."""
+        """Data type of the features of all samples in the dataset."""
         return self.__dtype
 
 
     @dtype.setter
     def dtype(self, type_val):
-        if self.__dtype is None:
-            if not isinstance(type_val, type):
+        if self.num_samples < 1:
+            try:
+                self.__dtype = np.dtype(type_val)
+            except TypeError:
                 raise TypeError('Invalid data type.')
-            self.__dtype = type_val
         else:
-            warn('Data type is already inferred. Can not be set!')
+            warn('Data type is already set by existing samples. Can not be set!')
 
 
     @property
     def num_samples(self):
         """number of samples in the entire dataset."""
-        if self.__data is not None:
-            return len(self.__data)
-        else:
-            return 0
+        # maintained as samples are added or removed
+        return self.__num_samples
 
 
     @property
     def num_classes(self):
         """Total number of classes in the dataset."""
-        return len(self.class_set)
+        return int(np.count_nonzero(self.__class_tally))
 
 
     @property
@@ -1083,7 +1516,7 @@ class MLDataset(object):
     def class_set(self):
         """Set of unique classes in the dataset."""
 
-        return list(set(self.__classes.values()))
+        return list(self.class_sizes)
 
 
     @property
@@ -1119,13 +1552,13 @@ class MLDataset(object):
             raise TypeError('Input classes is not a dict!')
         if not len(classes) == self.num_samples:
             raise ValueError('Too few items - need {} keys'.format(self.num_samples))
-        if not all([key in self.keys for key in classes]):
+        if self.__row_index.keys() != classes.keys():
             raise ValueError('One or more unrecognized keys!')
-        self.__classes = classes
+        self.__set_classes(OrderedDict(classes))
 
 
     def __len__(self):
-        return self.num_samples
+        return self.__num_samples
 
 
     def __nonzero__(self):
@@ -1141,17 +1574,13 @@ class MLDataset(object):
         if self.description not in [None, '']:
             full_descr.append(self.description)
         if bool(self):
-            full_descr.append('{} samples, {} classes, {} features'.format(
-                    self.num_samples, self.num_classes, self.num_features))
-            class_ids = list(self.class_sizes)
-            max_width = max([len(cls) for cls in class_ids])
-            num_digit = max([len(str(val)) for val in self.class_sizes.values()])
-            for cls in class_ids:
-                full_descr.append(
-                    'Class {cls:>{clswidth}} : '
-                    '{size:>{numwidth}} samples'.format(cls=cls, clswidth=max_width,
-                                                        size=self.class_sizes.get(cls),
-                                                        numwidth=num_digit))
+            full_descr.append(f'{self.num_samples} samples, {self.num_classes} classes, '
+                              f'{self.num_features} features')
+            class_sizes = self.class_sizes
+            max_width = max(map(len, class_sizes), default=0)
+            num_digit = len(str(max(class_sizes.values(), default=0)))
+            full_descr.extend(f'Class {cls:>{max_width}} : {size:>{num_digit}} samples'
+                              for cls, size in class_sizes.items())
         else:
             full_descr.append('Empty dataset.')
 
@@ -1177,46 +1606,16 @@ class MLDataset(object):
     @staticmethod
     def __dir__():
         """Returns the preferred list of attributes to be used with the dataset."""
-        return ['add_sample',
-                'glance',
-                'summarize_classes',
-                'sample_ids_in_class',
-                'train_test_split_ids',
-                'random_subset_ids',
-                'random_subset_ids_by_count',
-                'classes',
-                'class_set',
-                'class_sizes',
-                'data_and_labels',
-                'get_data_matrix_in_order',
-                'data',
-                'del_sample',
-                'description',
-                'extend',
-                'feature_names',
-                'get',
-                'get_class',
-                'get_subset',
-                'random_subset',
-                'get_feature_subset',
-                'keys',
-                'labels',
-                'label_set',
-                'num_classes',
-                'num_features',
-                'num_samples',
-                'sample_ids',
-                'save',
-                'compatible',
-                'transform',
-                'add_classes']
+        return _MLDATASET_DIR
 
 
     def __copy(self, other):
         """Copy constructor."""
-        self.__data = copy.deepcopy(other.data)
-        self.__classes = copy.deepcopy(other.classes)
-        self.__labels = copy.deepcopy(other.labels)
+        other.__compact()
+        self.__index_rows(other.__row_index)
+        self.__feature_matrix = other.__feature_matrix[:other.num_samples].copy()
+        self.__set_labels(copy.deepcopy(other.__labels))
+        self.__set_classes(copy.deepcopy(other.__classes))
         self.__dtype = copy.deepcopy(other.dtype)
         self.__description = copy.deepcopy(other.description)
         self.__feature_names = copy.deepcopy(other.feature_names)
@@ -1231,12 +1630,36 @@ class MLDataset(object):
             path = os.path.abspath(path)
             with open(path, 'rb') as df:
                 # loaded_dataset = pickle.load(df)
-                self.__data, self.__classes, self.__labels, \
-                self.__dtype, self.__description, \
-                self.__num_features, self.__feature_names = pickle.load(df)
+                contents = pickle.load(df)
 
-            # ensure the loaded dataset is valid
-            self.__validate(self.__data, self.__classes, self.__labels)
+            if isinstance(contents[0], dict):
+                # older versions saved a dict of features, one array per sample
+                data, self.__classes, self.__labels, \
+                self.__dtype, self.__description, \
+                self.__num_features, self.__feature_names = contents
+                # ensure the loaded dataset is valid
+                self.__validate(data, self.__classes, self.__labels)
+                if not isinstance(self.__dtype, np.dtype):
+                    # they also saved the container type, instead of element type
+                    self.__dtype = None
+                self.__set_data(data)
+            else:
+                sample_ids, features, self.__classes, self.__labels, \
+                self.__dtype, self.__description, \
+                self.__num_features, self.__feature_names = contents
+                self.__index_rows(sample_ids)
+                self.__feature_matrix = features
+                # ensure the loaded dataset is valid
+                if not len(self.__row_index) == features.shape[0]:
+                    raise ValueError('Number of sample ids and rows of features '
+                                     'in the saved dataset do not match!')
+                if not self.__row_index.keys() == self.__labels.keys() \
+                       == self.__classes.keys():
+                    raise ValueError('features, classes and labels in the saved '
+                                     'dataset must have the same sample ids!')
+
+            self.__set_labels(self.__labels)
+            self.__set_classes(self.__classes)
 
         except IOError as ioe:
             raise IOError('Unable to read the dataset from file: {}', format(ioe))
@@ -1275,9 +1698,12 @@ class MLDataset(object):
         self.__description = arff_meta.name  # to enable it as a label e.g. in neuropredict
 
         # initializing the key containers, before calling self.add_sample
-        self.__data = OrderedDict()
+        self.__index_rows(())
+        self.__feature_matrix = np.empty((0, 0), dtype=self.__dtype)
         self.__labels = OrderedDict()
+        self.__labels_array = np.empty(0, dtype=object)
         self.__classes = OrderedDict()
+        self.__init_class_tally()
 
         num_samples = len(arff_data)
         num_digits = len(str(num_samples))
@@ -1326,14 +1752,18 @@ class MLDataset(object):
         #       i.e. use case: compatibility check with #subjects, ids and their classes
         #   2) random access layout: being able to read features for a single subject!
 
+        self.__compact()
         try:
             file_path = os.path.abspath(file_path)
             with open(file_path, 'wb') as df:
                 # pickle.dump(self, df)
-                pickle.dump((self.__data, self.__classes, self.__labels,
+                # saving the features as a single matrix, rather than one array
+                #   per sample, as the latest protocol pickles its buffer directly
+                pickle.dump((self.keys, self.__feature_matrix[:self.num_samples],
+                             self.__classes, self.__labels,
                              self.__dtype, self.__description, self.__num_features,
                              self.__feature_names),
-                            df)
+                            df, protocol=pickle.HIGHEST_PROTOCOL)
             return
         except IOError as ioe:
             raise IOError('Unable to save the dataset to file: {}', format(ioe))
@@ -1345,34 +1775,46 @@ class MLDataset(object):
     def __validate(data, classes, labels):
         "Validator of inputs."
 
-        if not isinstance(data, dict):
+        if not isinstance(data, Mapping):
             raise TypeError(
                 'data must be a dict! keys: sample ID or any unique identifier')
-        if not isinstance(labels, dict):
+        if not isinstance(labels, Mapping):
             raise TypeError(
                 'labels must be a dict! keys: sample ID or any unique identifier')
         if classes is not None:
-            if not isinstance(classes, dict):
+            if not isinstance(classes, Mapping):
                 raise TypeError(
                     'labels must be a dict! keys: sample ID or any unique identifier')
 
         if not len(data) == len(labels) == len(classes):
             raise ValueError('Lengths of data, labels and classes do not match!')
-        if not set(list(data)) == set(list(labels)) == set(list(classes)):
+        # key views compare like sets, without building any intermediate sets
+        if not data.keys() == labels.keys() == classes.keys():
             raise ValueError(
                 'data, classes and labels dictionaries must have the same keys!')
 
-        num_features_in_elements = np.unique([sample.size for sample in data.values()])
-        if len(num_features_in_elements) > 1:
-            raise ValueError(
-                'different samples have different number of features - invalid!')
+        MLDataset.__check_num_features(data)
 
         return True
 
 
+    @staticmethod
+    def __check_num_features(data):
+        "Ensures all the samples in a dict of features have the same number of features."
+
+        # single pass, stopping at the first sample differing from the rest
+        samples = iter(data.values())
+        num_features = np.size(next(samples, None))
+        for sample in samples:
+            if np.size(sample) != num_features:
+                raise ValueError(
+                    'different samples have different number of features - invalid!')
+
+
     def extend(self, other):
         """
         Method to extend the dataset vertically (add samples from  anotehr dataset).
+        Features of both datasets are stored in the data type they both promote to.
 
         Parameters
         ----------
@@ -1388,9 +1830,14 @@ class MLDataset(object):
 
         if not isinstance(other, MLDataset):
             raise TypeError('Incorrect type of dataset provided!')
-        # assert self.__dtype==other.dtype, TypeError('Incorrect data type of features!')
-        for sample in other.keys:
-            self.add_sample(sample, other.data[sample], other.labels[sample],
+        # promoting to a data type that holds features of both without loss,
+        #   same as when concatenating features of two datasets
+        dtype = np.result_type(self.__dtype, other.dtype)
+        if dtype != self.__dtype:
+            self.__feature_matrix = self.__feature_matrix.astype(dtype)
+            self.__dtype = dtype
+        for sample, features in other:
+            self.add_sample(sample, features, other.labels[sample],
                             other.classes[sample])
 
         # TODO need a mechanism add one feature at a time, and
@@ -1403,24 +1850,29 @@ class MLDataset(object):
         if not isinstance(other, MLDataset):
             raise TypeError('Incorrect type of dataset provided!')
 
-        if set(self.keys) == set(other.keys):
+        if self.__row_index.keys() == other.__row_index.keys():
             print('Identical keys found. '
                   'Trying to horizontally concatenate features for each sample.')
-            if not self.__classes == other.classes:
+            if not self.__classes == other.__classes:
                 raise ValueError(
                     'Class identifiers per sample differ in the two datasets!')
             if other.num_features < 1:
                 raise ValueError('No features to concatenate.')
-            # making an empty dataset
-            combined = MLDataset()
-            # populating it with the concatenated feature set
-            for sample in self.keys:
-                comb_data = np.concatenate([self.__data[sample], other.data[sample]])
-                combined.add_sample(sample, comb_data,
-                                    self.__labels[sample], self.__classes[sample])
-
+            # concatenating the two matrices at once, with rows of other
+            #   in the order of samples in this dataset
+            self.__compact()
+            sample_ids = self.keys
+            other_rows = [other.__row_index[sid] for sid in sample_ids]
+            comb_matrix = np.hstack([self.__feature_matrix[:self.num_samples],
+                                     other.__feature_matrix[other_rows]])
             comb_names = np.concatenate([self.__feature_names, other.feature_names])
-            combined.feature_names = comb_names
+
+            # the stacked matrix has the type both data types promote to
+            combined = MLDataset(dtype=comb_matrix.dtype)
+            combined.add_samples(sample_ids, comb_matrix,
+                                 self.__labels_array[:self.num_samples],
+                                 [self.__classes[sid] for sid in sample_ids],
+                                 feature_names=comb_names)
 
             return combined
 
@@ -1448,9 +1900,11 @@ class MLDataset(object):
             warn(
                 'Requested removal of all the samples - output dataset would be empty.')
 
-        removed = copy.deepcopy(self)
-        for sample in other.keys:
-            removed.del_sample(sample)
+        # gathering the remaining rows at once, rather than deleting one at a time
+        self.__compact()
+        rows = [row for sample, row in self.__row_index.items() if sample not in other]
+        removed = self.__get_subset_from_rows(rows)
+        removed.__description = self.__description
 
         return removed
 
@@ -1467,15 +1921,15 @@ class MLDataset(object):
 
     def __eq__(self, other):
         """Equality of two datasets in samples and their values."""
-        if set(self.keys) != set(other.keys):
+        if self.__row_index.keys() != other.__row_index.keys():
             print('differing sample ids.')
             return False
         elif dict(self.__classes) != dict(other.classes):
             print('differing classes for the sample ids.')
             return False
-        elif id(self.__data) != id(other.data):
+        elif self is not other:
             for key in self.keys:
-                if not np.all(self.data[key] == other.data[key]):
+                if not np.all(self[key] == other[key]):
                     print('differing data for the sample ids.')
                     return False
             return True
@@ -1,5 +1,8 @@
 import os, sys
+import copy
+import pickle
 import numpy as np
+from collections import Counter, OrderedDict
 from os.path import join as pjoin, exists as pexists, realpath, basename, dirname, isfile
 
 sys.dont_write_bytecode = True
@@ -75,6 +78,19 @@ def test_empty():
 def test_num_classes():
     assert test_dataset.num_classes == num_classes
 
+def test_class_sizes_track_changes():
+    ds = MLDataset(in_dataset=copy_dataset)
+    assert ds.class_sizes == Counter(ds.classes.values())
+
+    sid = ds.sample_ids[0]
+    ds.add_sample(sid, ds[sid], 1, 'brand_new_class', overwrite=True)
+    assert ds.class_sizes['brand_new_class'] == 1
+    assert ds.class_sizes == Counter(ds.classes.values())
+
+    ds.del_sample(sid)
+    assert 'brand_new_class' not in ds.class_set
+    assert ds.class_sizes == Counter(ds.classes.values())
+
 def test_num_features():
     assert test_dataset.num_features == num_features
 
@@ -154,10 +170,141 @@ def test_return_data_labels():
     assert len(vec_labels)==len(sub_ids)
     assert len(vec_labels)==matrix.shape[0]
 
+def test_data_and_labels_follow_sample_ids():
+    ds = MLDataset(in_dataset=copy_dataset)
+    ds.del_sample(ds.sample_ids[1])
+    sid = ds.sample_ids[0]
+    ds.add_sample(sid, ds[sid], -1, overwrite=True)
+    matrix, vec_labels, sub_ids = ds.data_and_labels()
+    assert np.all(vec_labels == [ds.labels[sid] for sid in sub_ids])
+    assert np.all(matrix == ds.get_data_matrix_in_order(list(sub_ids)))
+
+def test_data_setter_keeps_labels_and_classes():
+    ds = MLDataset()
+    for sid, label, cls in zip('abc', (1, 2, 3), 'ABC'):
+        ds.add_sample(sid, [label, label], label, cls)
+
+    ds.data = OrderedDict([('c', [30, 30]), ('a', [10, 10]), ('b', [20, 20])])
+    matrix, labels, sample_ids = ds.data_and_labels()
+    assert list(sample_ids) == ['c', 'a', 'b']
+    assert np.all(labels == [3, 1, 2])
+    assert np.all(matrix[:, 0] == [30, 10, 20])
+    assert ds.get_class('A').sample_ids == ['a']
+    assert ds.class_sizes == Counter(A=1, B=1, C=1)
+
+    with raises(ValueError):
+        ds.data = {'a': [1, 1], 'b': [2, 2], 'x': [3, 3]}  # unknown id
+
+
+def test_rejected_data_leaves_dataset_unchanged():
+    ds = MLDataset()
+    for sid, value in zip('abc', range(3)):
+        ds.add_sample(sid, [value, value], value, str(value))
+
+    with raises(TypeError):
+        ds.data = OrderedDict([('c', ['x', 'y']), ('b', [1, 1]), ('a', [0, 0])])
+    with raises(ValueError):
+        ds.data = OrderedDict([('c', [2, 2, 2]), ('b', [1, 1]), ('a', [0, 0])])
+
+    assert ds.sample_ids == ['a', 'b', 'c']
+    matrix, labels, sample_ids = ds.data_and_labels()
+    assert np.all(matrix[:, 0] == [0, 1, 2]) and np.all(labels == [0, 1, 2])
+    assert np.all(ds['a'] == [0, 0]) and np.all(ds['c'] == [2, 2])
+
+
+def test_labels_and_classes_stay_in_sync():
+    ds = MLDataset()
+    ds.add_sample('a', [1, 1], 1, 'A')
+    ds.add_sample('b', [2, 2], 2, 'B')
+
+    ds.labels['a'] = 7
+    assert np.all(ds.data_and_labels()[1] == [7, 2])
+    assert ds.labels['a'] == 7
+
+    ds.classes['b'] = 'A'
+    assert ds.get_class('A').sample_ids == ds.sample_ids_in_class('A') == ['a', 'b']
+    assert ds.class_sizes == Counter(A=2)
+    assert ds.num_classes == 1
+
+    # copies are plain dicts, detached from the dataset
+    for labels in (copy.deepcopy(ds.labels), pickle.loads(pickle.dumps(ds.labels))):
+        assert labels == OrderedDict([('a', 7), ('b', 2)])
+        labels['a'] = 0
+    assert ds.labels['a'] == 7
+
+    # adding or removing ids does not change the dataset
+    labels = ds.labels
+    labels.pop('a')
+    labels['c'] = 3
+    assert ds.labels == {'a': 7, 'b': 2} and ds.sample_ids == ['a', 'b']
+    with raises(ValueError):
+        ds.labels = labels
+    assert np.all(ds.data_and_labels()[1] == [7, 2])
+
+
+def test_features_stable_after_changes():
+    ds = MLDataset()
+    for sid, value in zip('abcd', range(4)):
+        ds.add_sample(sid, [value, value], value, 'A' if value % 2 else 'B')
+
+    fb = ds['b']
+    ds.del_sample('a')
+    assert np.all(fb == [1, 1])
+    assert np.all(ds['b'] == [1, 1]) and np.all(ds.get('c') == [2, 2])
+    assert ds.sample_ids == ['b', 'c', 'd']
+    assert ds.class_sizes == Counter(A=2, B=1)
+
+    fc = ds['c']
+    ds['c'] = [9, 9]
+    assert np.all(fc == [2, 2])
+    fc[0] = -1  # must not alter the dataset
+    assert np.all(ds['c'] == [9, 9])
+
+    ds.add_sample('e', [4, 4], 4, 'B')
+    matrix, labels, sample_ids = ds.data_and_labels()
+    assert list(sample_ids) == ['b', 'c', 'd', 'e']
+    assert np.all(matrix[:, 0] == [1, 9, 3, 4])
+    assert np.all(labels == [1, 2, 3, 4])
+    assert ds.get_class('B').sample_ids == ['c', 'e']
+
+    other = ds.get_subset(['b', 'd'])
+    remaining = ds - other
+    assert remaining.sample_ids == ['c', 'e']
+    assert np.all(remaining['e'] == [4, 4])
+    assert remaining.class_sizes == Counter(B=2)
+
+
+def test_data_view():
+    ds = MLDataset(in_dataset=copy_dataset)
+    data = ds.data
+    sid = ds.sample_ids[0]
+    assert len(data) == ds.num_samples and sid in data
+    assert list(data) == ds.sample_ids
+    assert np.all(data[sid] == ds[sid])
+    with raises(TypeError):
+        data[sid] = ds[sid]
+
+    ds.del_sample(sid)
+    assert sid not in data and len(data) == ds.num_samples
+
+
 def test_init_with_dict():
     new_ds = MLDataset(data=test_dataset.data, labels=test_dataset.labels, classes=test_dataset.classes)
     assert new_ds == test_dataset
 
+def test_init_without_copying_dicts():
+    data = OrderedDict([('a', [1, 2]), ('b', [3, 4])])
+    labels = OrderedDict([('a', 1), ('b', 2)])
+    classes = OrderedDict([('a', 'A'), ('b', 'B')])
+
+    copied = MLDataset(data=data, labels=labels, classes=classes)
+    owned = MLDataset(data=data, labels=labels, classes=classes, copy_dicts=False)
+    assert copied == owned
+
+    owned.add_sample('c', [5, 6], 3, 'C')
+    assert 'c' in labels and 'c' in classes  # given dicts were taken over
+    assert 'c' not in copied.labels and copied.num_samples == 2
+
 def test_labels_setter():
     fewer_labels = test_dataset.labels
     label_keys = list(fewer_labels.keys())
@@ -198,6 +345,86 @@ def test_feat_names_setter():
     with raises(ValueError):
         test_dataset.feature_names = np.append(feat_names, 'blahblah')
 
+def test_num_samples_tracks_changes():
+    ds = MLDataset()
+    assert ds.num_samples == len(ds) == 0
+    ds.add_sample('a', [1, 2], 0, 'x')
+    ds.add_sample('b', [3, 4], 1, 'y')
+    ds.add_sample('a', [5, 6], 0, 'x', overwrite=True)  # keeps the count
+    assert ds.num_samples == len(ds) == 2
+    ds.add_samples(['c', 'd'], [[7, 8], [9, 10]], [0, 1], ['x', 'y'])
+    assert ds.num_samples == len(ds) == 4
+    ds.del_sample('b')
+    assert ds.num_samples == len(ds) == 3
+    assert len(ds.get_class('x')) == 2
+    assert len(MLDataset(in_dataset=ds)) == 3
+
+
+def test_add_samples():
+    ids = copy_dataset.sample_ids
+    matrix, labels, _ = copy_dataset.data_and_labels()
+    classes = [copy_dataset.classes[sid] for sid in ids]
+
+    bulk = MLDataset()
+    half = len(ids) // 2
+    bulk.add_samples(ids[:half], matrix[:half], labels[:half], classes[:half],
+                     feature_names=copy_dataset.feature_names)
+    bulk.add_samples(ids[half:], matrix[half:], labels[half:], classes[half:])
+    assert bulk == copy_dataset
+    assert bulk.sample_ids == ids
+    assert bulk.class_sizes == copy_dataset.class_sizes
+    assert np.all(bulk.feature_names == copy_dataset.feature_names)
+
+    with raises(ValueError):
+        bulk.add_samples(ids[:1], matrix[:1], labels[:1])  # existing id
+
+    with raises(ValueError):
+        bulk.add_samples(['new1', 'new1'], matrix[:2], labels[:2])  # repeated ids
+
+    with raises(ValueError):
+        bulk.add_samples(['new1', 'new2'], matrix[:2, :-1], labels[:2])  # diff dim
+
+    with raises(ValueError):
+        bulk.add_samples(['new1', 'new2'], matrix[:3], labels[:2])  # diff sizes
+
+def test_dtype():
+    assert test_dataset.dtype == np.float64
+
+    single = MLDataset(dtype=np.float32)
+    for sid, features in copy_dataset:
+        single.add_sample(sid, features, copy_dataset.labels[sid],
+                          copy_dataset.classes[sid])
+    assert single.dtype == np.float32
+    assert single.data_and_labels()[0].dtype == np.float32
+    assert single.get_subset(single.sample_ids[:3]).dtype == np.float32
+
+    with raises(TypeError):
+        single.add_sample('non_numeric', ['a', ] * num_features, 1)
+
+def test_transform_dtype():
+    ints = MLDataset(dtype=np.int64)
+    ints.add_sample('a', [1, 2], 1, 'A')
+    ints.add_sample('b', [3, 4], 2, 'B')
+
+    logged = ints.transform(np.log, 'log')
+    assert logged.dtype == np.float64
+    assert np.allclose(logged['a'], np.log([1, 2]))
+    assert ints.transform(lambda x: 2 * x).dtype == np.int64
+
+def test_combine_dtype():
+    single = MLDataset(dtype=np.float32)
+    single.add_sample('a', [0.1, 0.2], 1, 'A')
+    double = MLDataset()
+    double.add_sample('b', [1 / 3, 2 / 3], 2, 'B')
+
+    assert (single + double).dtype == (double + single).dtype == np.float64
+    assert np.all((single + double)['b'] == double['b'])
+
+    single.extend(double)
+    assert single.dtype == np.float64
+    assert single.data_and_labels()[0].dtype == np.float64
+    assert np.all(single['b'] == double['b'])
+
 def test_add_existing_id():
     sid = test_dataset.sample_ids[0]
     with raises(ValueError):
@@ -227,6 +454,29 @@ def test_rand_feat_subset():
     subds = copy_dataset.get_feature_subset(subset)
     assert subds.num_features == subset_len
 
+def test_feature_subset_and_concat_values():
+    ds = MLDataset()
+    for sid, value in zip('abcd', range(4)):
+        ds.add_sample(sid, [value, 10 * value, 100 * value], value, str(value % 2))
+    ds.del_sample('a')
+
+    subds = ds.get_feature_subset([2, 0])
+    assert subds.sample_ids == ['b', 'c', 'd']
+    assert np.all(subds['c'] == [200, 2])
+    assert np.all(subds.feature_names == ['f2', 'f0'])
+    assert subds.labels == ds.labels and subds.classes == ds.classes
+
+    other = MLDataset(dtype=np.float32)
+    other.add_sample('x', [0], 0, '0')
+    for sid in ('b', 'c', 'd'):
+        other.add_sample(sid, [-ds[sid][0]], ds.labels[sid], ds.classes[sid])
+    other.del_sample('x')
+    comb = ds + other
+    assert comb.sample_ids == ['b', 'c', 'd'] and comb.dtype == np.float64
+    assert np.all(comb['d'] == [3, 30, 300, -3])
+    assert comb.class_sizes == ds.class_sizes
+
+
 def test_eq_self():
     assert test_dataset == test_dataset
 
@@ -240,10 +490,31 @@ def test_unpickling():
     reloaded_dataset = MLDataset(filepath=out_file, description='reloaded test_dataset')
     assert copy_dataset == reloaded_dataset
 
+def test_unpickling_older_format():
+    # older versions saved a dict of features, along with the container type
+    out_file = os.path.join(out_dir, 'random_pickled_dataset_older_format.pkl')
+    with open(out_file, 'wb') as df:
+        pickle.dump((copy_dataset.data, copy_dataset.classes, copy_dataset.labels,
+                     np.ndarray, copy_dataset.description, copy_dataset.num_features,
+                     copy_dataset.feature_names), df)
+    reloaded = MLDataset(filepath=out_file)
+    assert copy_dataset == reloaded
+    assert reloaded.dtype == copy_dataset.dtype
+    assert reloaded.class_sizes == copy_dataset.class_sizes
+
 def test_subset_class():
     assert random_class_ds.num_samples == class_sizes[rand_index]
 
 
+def test_get_class_keeps_attributes():
+    class_id = copy_dataset.class_set[0]
+    subset = copy_dataset.get_class(class_id)
+    assert subset.class_sizes == {class_id: copy_dataset.class_sizes[class_id]}
+    assert subset.sample_ids == copy_dataset.sample_ids_in_class(class_id)
+    for sid, features in subset:
+        assert subset.labels[sid] == copy_dataset.labels[sid]
+        assert np.all(features == copy_dataset[sid])
+
 def test_get_subset():
     assert random_class_ds == reloaded_dataset.get_class(random_class_name)
 
@@ -251,6 +522,18 @@ def test_get_subset():
     with warns(UserWarning):
         test_dataset.get_subset(nonexisting_id)
 
+def test_get_subset_preserves_order():
+    subset_ids = copy_dataset.sample_ids[::-3]
+    subset = copy_dataset.get_subset(subset_ids + [u'sdlkfj3498nonexisting', ])
+    assert subset.sample_ids == subset_ids
+    assert np.all(subset.data_and_labels()[0] ==
+                  copy_dataset.get_data_matrix_in_order(subset_ids))
+
+def test_data_matrix_in_order_nonexisting():
+    with raises(ValueError):
+        copy_dataset.get_data_matrix_in_order([copy_dataset.sample_ids[0],
+                                               u'sdlkfj3498nonexisting'])
+
 def test_membership():
     rand_idx = np.random.randint(0, test_dataset.num_samples)
     member = test_dataset.sample_ids[rand_idx]